@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import requests
 import argparse
 import os
 import sys
@@ -17,6 +16,9 @@ if not token:
     print("Error: no token provided. Set the 'civitai_token' environment variable or use --token.")
     sys.exit(1)
 
+# Imported only once we know a request will be made, so --help and a missing token exit fast
+import requests
+
 # URL of the file to download
 url = f"https://civitai.com/api/v1/model-versions/{args.model}"
 
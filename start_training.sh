@@ -35,6 +35,57 @@ print_info() {
     echo -e "${BLUE}ℹ $1${NC}"
 }
 
+# Prompt until the user enters a number between 1 and $1, then set MENU_INDEX to its zero-based index
+read_menu_choice() {
+    local count=$1
+    local choice
+    while true; do
+        read -p "Enter your choice (1-$count): " choice
+        if [[ "$choice" =~ ^[0-9]+$ ]] && [ "$choice" -ge 1 ] && [ "$choice" -le "$count" ]; then
+            MENU_INDEX=$((10#$choice - 1))
+            return 0
+        fi
+        print_error "Invalid choice. Please enter a number between 1-$count."
+    done
+}
+
+# Captioning modes in menu order
+CAPTION_MODES=(images videos both skip)
+CAPTION_MODE_LABELS=("Images only" "Videos only" "Both images and videos" "Skip captioning (use existing captions)")
+
+# Dataset file extensions (find -iregex, matched case-insensitively against the full path)
+IMAGE_EXT_REGEX='.*\.\(jpg\|jpeg\|png\|bmp\|gif\|tiff\|webp\)'
+VIDEO_EXT_REGEX='.*\.\(mp4\|avi\|mov\|mkv\|webm\)'
+
+# Count matching files in a directory (non-recursive)
+# Emits one byte per match rather than the full path, so large datasets stay cheap to count
+count_dataset_files() {
+    local dir=$1
+    local regex=$2
+    find "$dir" -maxdepth 1 -type f -iregex "$regex" -printf '.' 2>/dev/null | wc -c
+}
+
+# Check whether a directory has at least one matching file (non-recursive)
+# Stops at the first match, so validation time does not grow with dataset size
+has_dataset_files() {
+    local dir=$1
+    local regex=$2
+    [ -n "$(find "$dir" -maxdepth 1 -type f -iregex "$regex" -print -quit 2>/dev/null)" ]
+}
+
+# Seconds to sleep between status checks of a background job that has run for $1 seconds:
+# poll quickly at first so short jobs finish promptly, then back off for long-running ones
+poll_interval() {
+    local elapsed=$1
+    if [ "$elapsed" -lt 10 ]; then
+        echo 1
+    elif [ "$elapsed" -lt 60 ]; then
+        echo 3
+    else
+        echo 10
+    fi
+}
+
 # Welcome message
 clear
 print_header "Welcome to HearmemanAI LoRA Trainer using Diffusion Pipe"
@@ -106,77 +157,72 @@ elif [ -f /tmp/flash_attn_pid ]; then
     fi
 fi
 
+# Supported models, one entry per index across all arrays (menu order)
+# MODEL_SUBDIRS are relative to the models directory, OUTPUT_SUBDIRS to training-outputs
+MODEL_TYPES=(flux sdxl wan13 wan14b_t2v wan14b_i2v qwen z_image_turbo)
+MODEL_NAMES=("Flux" "SDXL" "Wan 1.3B" "Wan 14B Text-To-Video" "Wan 14B Image-To-Video" "Qwen Image" "Z Image Turbo")
+MODEL_MENU_NOTES=("" "" "" "Supports both T2V and I2V" "Not recommended, for advanced users only" "" "")
+MODEL_TOMLS=(flux.toml sdxl.toml wan13_video.toml wan14b_t2v.toml wan14b_i2v.toml qwen_toml.toml z_image_toml.toml)
+MODEL_HF_REPOS=(black-forest-labs/FLUX.1-dev timoshishi/sdXL_v10VAEFix Wan-AI/Wan2.1-T2V-1.3B Wan-AI/Wan2.1-T2V-14B Wan-AI/Wan2.1-I2V-14B-480P Qwen/Qwen-Image Comfy-Org/z_image_turbo)
+# 1 for gated repos that need HUGGING_FACE_TOKEN
+MODEL_NEEDS_HF_TOKEN=(1 0 0 0 0 0 0)
+MODEL_SUBDIRS=(flux "" Wan/Wan2.1-T2V-1.3B Wan/Wan2.1-T2V-14B Wan/Wan2.1-I2V-14B-480P Qwen-Image z_image)
+OUTPUT_SUBDIRS=(flux_lora sdxl_lora wan13_lora wan14b_t2v_lora wan14b_i2v_lora qwen_lora z_image_lora)
+# Files (relative to the model directory) that must exist once downloaded. Sharded checkpoints are
+# listed by their *.index.json, and every shard named in its weight_map is required as well.
+MODEL_REQUIRED_FILES=(
+    "flux1-dev.safetensors ae.safetensors model_index.json transformer/diffusion_pytorch_model.safetensors.index.json text_encoder/model.safetensors text_encoder_2/model.safetensors.index.json vae/diffusion_pytorch_model.safetensors"
+    "sdXL_v10VAEFix.safetensors"
+    "diffusion_pytorch_model.safetensors models_t5_umt5-xxl-enc-bf16.pth Wan2.1_VAE.pth"
+    "diffusion_pytorch_model.safetensors.index.json models_t5_umt5-xxl-enc-bf16.pth Wan2.1_VAE.pth"
+    "diffusion_pytorch_model.safetensors.index.json models_t5_umt5-xxl-enc-bf16.pth models_clip_open-clip-xlm-roberta-large-vit-huge-14.pth Wan2.1_VAE.pth"
+    "model_index.json transformer/diffusion_pytorch_model.safetensors.index.json text_encoder/model.safetensors.index.json vae/diffusion_pytorch_model.safetensors"
+    "z_image_turbo_bf16.safetensors ae.safetensors qwen_3_4b.safetensors zimage_turbo_training_adapter_v2.safetensors"
+)
+# 1 to skip hf download entirely when MODEL_REQUIRED_FILES are present (single-file and hand-picked
+# downloads); full repo snapshots always go through hf download, which skips complete files itself
+MODEL_FILES_PINNED=(0 1 0 0 0 0 1)
+# Approximate download size of each model in GiB, used for the disk space preflight and download timeout
+MODEL_SIZES_GIB=(58 7 17 69 82 58 21)
+MODEL_COUNT=${#MODEL_TYPES[@]}
+
 # Model selection
 echo -e "${BOLD}Please select the model you want to train:${NC}"
 echo ""
-echo "1) Flux"
-echo "2) SDXL"
-echo "3) Wan 1.3B"
-echo "4) Wan 14B Text-To-Video (Supports both T2V and I2V)"
-echo "5) Wan 14B Image-To-Video (Not recommended, for advanced users only)"
-echo "6) Qwen Image"
-echo "7) Z Image Turbo"
+for i in "${!MODEL_TYPES[@]}"; do
+    echo "$((i + 1))) ${MODEL_NAMES[i]}${MODEL_MENU_NOTES[i]:+ (${MODEL_MENU_NOTES[i]})}"
+done
 echo ""
 
-while true; do
-    read -p "Enter your choice (1-7): " model_choice
-    case $model_choice in
-        1)
-            MODEL_TYPE="flux"
-            MODEL_NAME="Flux"
-            TOML_FILE="flux.toml"
-            break
-            ;;
-        2)
-            MODEL_TYPE="sdxl"
-            MODEL_NAME="SDXL"
-            TOML_FILE="sdxl.toml"
-            break
-            ;;
-        3)
-            MODEL_TYPE="wan13"
-            MODEL_NAME="Wan 1.3B"
-            TOML_FILE="wan13_video.toml"
-            break
-            ;;
-        4)
-            MODEL_TYPE="wan14b_t2v"
-            MODEL_NAME="Wan 14B Text-To-Video"
-            TOML_FILE="wan14b_t2v.toml"
-            break
-            ;;
-        5)
-            MODEL_TYPE="wan14b_i2v"
-            MODEL_NAME="Wan 14B Image-To-Video"
-            TOML_FILE="wan14b_i2v.toml"
-            break
-            ;;
-        6)
-            MODEL_TYPE="qwen"
-            MODEL_NAME="Qwen Image"
-            TOML_FILE="qwen_toml.toml"
-            break
-            ;;
-        7)
-            MODEL_TYPE="z_image_turbo"
-            MODEL_NAME="Z Image Turbo"
-            TOML_FILE="z_image_toml.toml"
-            break
-            ;;
-        *)
-            print_error "Invalid choice. Please enter a number between 1-7."
-            ;;
-    esac
-done
+read_menu_choice "$MODEL_COUNT"
+idx=$MENU_INDEX
+MODEL_TYPE="${MODEL_TYPES[idx]}"
+MODEL_NAME="${MODEL_NAMES[idx]}"
+TOML_FILE="${MODEL_TOMLS[idx]}"
+MODEL_HF_REPO="${MODEL_HF_REPOS[idx]}"
+MODEL_NEEDS_TOKEN="${MODEL_NEEDS_HF_TOKEN[idx]}"
+MODEL_SUBDIR="${MODEL_SUBDIRS[idx]}"
+OUTPUT_SUBDIR="${OUTPUT_SUBDIRS[idx]}"
+MODEL_REQUIRED="${MODEL_REQUIRED_FILES[idx]}"
+MODEL_PINNED="${MODEL_FILES_PINNED[idx]}"
+MODEL_SIZE_GIB="${MODEL_SIZES_GIB[idx]}"
 
 echo ""
 print_success "Selected model: $MODEL_NAME"
 echo ""
 
+# Resolve every model-specific path once from the current NETWORK_VOLUME
+MODELS_DIR="$NETWORK_VOLUME/models"
+MODEL_DIR="$MODELS_DIR${MODEL_SUBDIR:+/$MODEL_SUBDIR}"
+EXAMPLES_DIR="$NETWORK_VOLUME/diffusion-pipe/examples"
+TOML_SOURCE_DIR="$NETWORK_VOLUME/diffusion-pipe-helper/toml_files"
+MODEL_TOML="$EXAMPLES_DIR/$TOML_FILE"
+DATASET_TOML="$EXAMPLES_DIR/dataset.toml"
+
 # Check and set required API keys
-if [ "$MODEL_TYPE" = "flux" ]; then
+if [ "$MODEL_NEEDS_TOKEN" = "1" ]; then
     if [ -z "$HUGGING_FACE_TOKEN" ] || [ "$HUGGING_FACE_TOKEN" = "token_here" ]; then
-        print_warning "Hugging Face token is required for Flux model."
+        print_warning "Hugging Face token is required for $MODEL_NAME model."
         echo ""
         echo "You can get your token from: https://huggingface.co/settings/tokens"
         echo ""
@@ -199,36 +245,13 @@ print_header "Dataset Configuration"
 echo ""
 echo -e "${BOLD}Do you want to caption images and/or videos?${NC}"
 echo ""
-echo "1) Images only"
-echo "2) Videos only"
-echo "3) Both images and videos"
-echo "4) Skip captioning (use existing captions)"
+for i in "${!CAPTION_MODES[@]}"; do
+    echo "$((i + 1))) ${CAPTION_MODE_LABELS[i]}"
+done
 echo ""
 
-while true; do
-    read -p "Enter your choice (1-4): " caption_choice
-    case $caption_choice in
-        1)
-            CAPTION_MODE="images"
-            break
-            ;;
-        2)
-            CAPTION_MODE="videos"
-            break
-            ;;
-        3)
-            CAPTION_MODE="both"
-            break
-            ;;
-        4)
-            CAPTION_MODE="skip"
-            break
-            ;;
-        *)
-            print_error "Invalid choice. Please enter a number between 1-4."
-            ;;
-    esac
-done
+read_menu_choice "${#CAPTION_MODES[@]}"
+CAPTION_MODE="${CAPTION_MODES[MENU_INDEX]}"
 
 echo ""
 
@@ -281,19 +304,18 @@ if [ "$CAPTION_MODE" != "skip" ]; then
             return 1
         fi
 
-        # Check for files (not just directories)
+        # Check for files (not just directories); exact counts are shown in the training summary
+        local regex="$VIDEO_EXT_REGEX"
         if [ "$type" = "Image" ]; then
-            file_count=$(find "$dir" -maxdepth 1 -type f \( -iname "*.jpg" -o -iname "*.jpeg" -o -iname "*.png" -o -iname "*.bmp" -o -iname "*.gif" -o -iname "*.tiff" -o -iname "*.webp" \) | wc -l)
-        else
-            file_count=$(find "$dir" -maxdepth 1 -type f \( -iname "*.mp4" -o -iname "*.avi" -o -iname "*.mov" -o -iname "*.mkv" -o -iname "*.webm" \) | wc -l)
+            regex="$IMAGE_EXT_REGEX"
         fi
 
-        if [ "$file_count" -eq 0 ]; then
+        if ! has_dataset_files "$dir" "$regex"; then
             print_error "No $type files found in: $dir"
             return 1
         fi
 
-        print_success "Found $file_count $type file(s) in: $dir"
+        print_success "Found $type files in: $dir"
         return 0
     }
 
@@ -351,7 +373,7 @@ echo -e "${WHITE}Model:${NC} $MODEL_NAME"
 echo -e "${WHITE}TOML Config:${NC} $TOML_FILE"
 echo -e "${WHITE}Caption Mode:${NC} $CAPTION_MODE"
 
-if [ "$MODEL_TYPE" = "flux" ]; then
+if [ "$MODEL_NEEDS_TOKEN" = "1" ]; then
     echo -e "${WHITE}Hugging Face Token:${NC} Set ✓"
 fi
 
@@ -415,209 +437,179 @@ print_header "Checking CUDA Compatibility"
 check_cuda_compatibility
 echo ""
 
+# Check whether the selected model's files are fully present on disk.
+# MODEL_DIR is scanned once (two levels deep, for diffusers subfolders; -L follows the symlinks
+# into the HF hub cache) and every entry of MODEL_REQUIRED, plus every shard named by a required
+# *.index.json, must be a non-empty file in it.
+# Sets MISSING_MODEL_FILES to the names of any missing required files.
+model_files_present() {
+    local name shard prefix
+    local -a required=()
+    local -A present=()
+    MISSING_MODEL_FILES=""
+
+    while IFS= read -r name; do
+        present[$name]=1
+    done < <(find -L "$MODEL_DIR" -mindepth 1 -maxdepth 2 -path "$MODEL_DIR/.cache" -prune -o -type f -size +0 -printf '%P\n' 2>/dev/null)
+
+    [ ${#present[@]} -gt 0 ] || return 1
+
+    for name in $MODEL_REQUIRED; do
+        required+=("$name")
+        case $name in
+            *.index.json)
+                [ -n "${present[$name]}" ] || continue
+                prefix=""
+                [[ "$name" == */* ]] && prefix="${name%/*}/"
+                while IFS= read -r shard; do
+                    required+=("$prefix$shard")
+                done < <(python3 -c 'import json, sys; print("\n".join(sorted(set(json.load(open(sys.argv[1]))["weight_map"].values()))))' "$MODEL_DIR/$name" 2>/dev/null)
+                ;;
+        esac
+    done
+
+    for name in "${required[@]}"; do
+        [ -n "${present[$name]}" ] || MISSING_MODEL_FILES="$MISSING_MODEL_FILES $name"
+    done
+    [ -z "$MISSING_MODEL_FILES" ] || return 1
+
+    # hf download leaves *.incomplete files under <local-dir>/.cache while a download is partial
+    [ -z "$(find "$MODEL_DIR/.cache" -name "*.incomplete" -print -quit 2>/dev/null)" ]
+}
+
 # Model download logic - start in background
 print_header "Starting Model Download"
 echo ""
 
-mkdir -p "$NETWORK_VOLUME/models"
+mkdir -p "$MODELS_DIR"
+
+# Number of files each hf download fetches concurrently (8 is hf's own default; set HF_MAX_WORKERS to tune)
+HF_MAX_WORKERS="${HF_MAX_WORKERS:-8}"
+# The hf download commands below set HF_XET_HIGH_PERFORMANCE=1 so the hf_xet backend bundled with
+# huggingface_hub uses more parallel connections. Background jobs also set PYTHONUNBUFFERED=1 so
+# tail -f on their log files shows progress live. Both are set per command so training never sees them.
 
 # Initialize MODEL_DOWNLOAD_PID to ensure it's always set
 MODEL_DOWNLOAD_PID=""
 
-case $MODEL_TYPE in
-    "flux")
-        if [ -z "$HUGGING_FACE_TOKEN" ] || [ "$HUGGING_FACE_TOKEN" = "token_here" ]; then
-            print_error "HUGGING_FACE_TOKEN is not set properly."
-            exit 1
-        fi
+if [ "$MODEL_NEEDS_TOKEN" = "1" ]; then
+    if [ -z "$HUGGING_FACE_TOKEN" ] || [ "$HUGGING_FACE_TOKEN" = "token_here" ]; then
+        print_error "HUGGING_FACE_TOKEN is not set properly."
+        exit 1
+    fi
 
-        print_info "HUGGING_FACE_TOKEN is set."
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/flux.toml" ]; then
-            print_info "flux.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/flux.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/flux.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied flux.toml to examples directory"
-        else
-            print_warning "flux.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/flux.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/flux.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/flux.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/flux_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/flux.toml"
-        fi
-        print_info "Starting Flux model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/flux"
-        hf download black-forest-labs/FLUX.1-dev --local-dir "$NETWORK_VOLUME/models/flux" --repo-type model --token "$HUGGING_FACE_TOKEN" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "sdxl")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/sdxl.toml" ]; then
-            print_info "sdxl.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/sdxl.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/sdxl.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied sdxl.toml to examples directory"
-        else
-            print_warning "sdxl.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/sdxl.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/sdxl.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/sdxl.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/sdxl_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/sdxl.toml"
-        fi
-        print_info "Starting Base SDXL model download in background..."
-        hf download timoshishi/sdXL_v10VAEFix sdXL_v10VAEFix.safetensors --local-dir "$NETWORK_VOLUME/models/" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "wan13")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan13_video.toml" ]; then
-            print_info "wan13_video.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan13_video.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan13_video.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied wan13_video.toml to examples directory"
-        else
-            print_warning "wan13_video.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan13_video.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/wan13_video.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan13_video.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/wan13_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/wan13_video.toml"
-        fi
-        print_info "Starting Wan 1.3B model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-1.3B"
-        hf download Wan-AI/Wan2.1-T2V-1.3B --local-dir "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-1.3B" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "wan14b_t2v")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_t2v.toml" ]; then
-            print_info "wan14b_t2v.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_t2v.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_t2v.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied wan14b_t2v.toml to examples directory"
-        else
-            print_warning "wan14b_t2v.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_t2v.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/wan14b_t2v.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_t2v.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/wan14b_t2v_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_t2v.toml"
-        fi
-        print_info "Starting Wan 14B T2V model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-14B"
-        hf download Wan-AI/Wan2.1-T2V-14B --local-dir "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-14B" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "wan14b_i2v")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_i2v.toml" ]; then
-            print_info "wan14b_i2v.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_i2v.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_i2v.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied wan14b_i2v.toml to examples directory"
-        else
-            print_warning "wan14b_i2v.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/wan14b_i2v.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/wan14b_i2v.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_i2v.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/wan14b_i2v_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/wan14b_i2v.toml"
-        fi
-        print_info "Starting Wan 14B I2V model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/Wan/Wan2.1-I2V-14B-480P"
-        hf download Wan-AI/Wan2.1-I2V-14B-480P --local-dir "$NETWORK_VOLUME/models/Wan/Wan2.1-I2V-14B-480P" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "qwen")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/qwen_toml.toml" ]; then
-            print_info "qwen_toml.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/qwen_toml.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/qwen_toml.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied qwen_toml.toml to examples directory"
-        else
-            print_warning "qwen_toml.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/qwen_toml.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/qwen_toml.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/qwen_toml.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/qwen_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/qwen_toml.toml"
-        fi
-        print_info "Starting Qwen Image model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/Qwen-Image"
-        hf download Qwen/Qwen-Image --local-dir "$NETWORK_VOLUME/models/Qwen-Image" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-
-    "z_image_turbo")
-        # Ensure examples directory exists
-        mkdir -p "$NETWORK_VOLUME/diffusion-pipe/examples"
-        
-        # Check if file already exists in destination
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/z_image_toml.toml" ]; then
-            print_info "z_image_toml.toml already exists in examples directory"
-        elif [ -f "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/z_image_toml.toml" ]; then
-            cp "$NETWORK_VOLUME/diffusion-pipe-helper/toml_files/z_image_toml.toml" "$NETWORK_VOLUME/diffusion-pipe/examples/"
-            print_success "Copied z_image_toml.toml to examples directory"
-        else
-            print_warning "z_image_toml.toml not found at expected location: $NETWORK_VOLUME/diffusion-pipe-helper/toml_files/z_image_toml.toml"
-            print_warning "Please ensure the file exists or manually copy it to: $NETWORK_VOLUME/diffusion-pipe/examples/z_image_toml.toml"
-        fi
-        # Update output_dir in destination file
-        if [ -f "$NETWORK_VOLUME/diffusion-pipe/examples/z_image_toml.toml" ]; then
-            sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/z_image_lora'|" "$NETWORK_VOLUME/diffusion-pipe/examples/z_image_toml.toml"
-        fi
-        print_info "Starting Z Image Turbo model download in background..."
-        mkdir -p "$NETWORK_VOLUME/models/z_image"
-        # Download model files using hf download and move to expected location
-        (
-            echo "Downloading Z Image Turbo models from HuggingFace..."
-            # Download main model files (diffusion model, VAE, text encoder)
-            hf download Comfy-Org/z_image_turbo --local-dir "$NETWORK_VOLUME/models/z_image_turbo_temp"
-            
-            echo "Moving model files to final location..."
-            # Move files to the expected location
-            mv "$NETWORK_VOLUME/models/z_image_turbo_temp/split_files/diffusion_models/z_image_turbo_bf16.safetensors" "$NETWORK_VOLUME/models/z_image/"
-            mv "$NETWORK_VOLUME/models/z_image_turbo_temp/split_files/vae/ae.safetensors" "$NETWORK_VOLUME/models/z_image/"
-            mv "$NETWORK_VOLUME/models/z_image_turbo_temp/split_files/text_encoders/qwen_3_4b.safetensors" "$NETWORK_VOLUME/models/z_image/"
-            
-            # Clean up temp directory
-            rm -rf "$NETWORK_VOLUME/models/z_image_turbo_temp"
-            
-            echo "Downloading Z Image Turbo training adapter..."
-            wget -q --show-progress -O "$NETWORK_VOLUME/models/z_image/zimage_turbo_training_adapter_v2.safetensors" \
-                "https://huggingface.co/ostris/zimage_turbo_training_adapter/resolve/main/zimage_turbo_training_adapter_v2.safetensors"
-            
-            echo "Z Image Turbo model download complete!"
-        ) > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
-        MODEL_DOWNLOAD_PID=$!
-        ;;
-esac
+    print_info "HUGGING_FACE_TOKEN is set."
+fi
+
+# Ensure examples directory exists
+mkdir -p "$EXAMPLES_DIR"
+
+# Check if file already exists in destination
+if [ -f "$MODEL_TOML" ]; then
+    print_info "$TOML_FILE already exists in examples directory"
+elif [ -f "$TOML_SOURCE_DIR/$TOML_FILE" ]; then
+    cp "$TOML_SOURCE_DIR/$TOML_FILE" "$EXAMPLES_DIR/"
+    print_success "Copied $TOML_FILE to examples directory"
+else
+    print_warning "$TOML_FILE not found at expected location: $TOML_SOURCE_DIR/$TOML_FILE"
+    print_warning "Please ensure the file exists or manually copy it to: $MODEL_TOML"
+fi
+# Update output_dir in destination file
+if [ -f "$MODEL_TOML" ]; then
+    sed -i "s|^output_dir = .*|output_dir = '$NETWORK_VOLUME/training-outputs/$OUTPUT_SUBDIR'|" "$MODEL_TOML"
+fi
+
+# Skip the download entirely when a previous run already left every pinned model file behind
+if [ "$MODEL_PINNED" = "1" ] && model_files_present; then
+    print_success "$MODEL_NAME model files already present, skipping download."
+else
+    # Fail now rather than hours into the download if the volume is too small.
+    # Whatever a previous run already downloaded (including partial files) is subtracted first,
+    # and the 15% headroom only applies to what is still left to fetch.
+    if [ "$MODEL_TYPE" = "sdxl" ]; then
+        # MODEL_DIR is the shared models directory, so only count SDXL's own file. hf names partial
+        # files <hash>.<etag>.incomplete, and SDXL is the only download into the models root.
+        existing_kb=$(du -skLc "$MODEL_DIR/sdXL_v10VAEFix.safetensors" "$MODEL_DIR"/.cache/huggingface/download/*.incomplete 2>/dev/null | awk 'END {print $1}')
+    else
+        existing_kb=$(du -skL "$MODEL_DIR" 2>/dev/null | awk '{print $1}')
+    fi
+    remaining_kb=$((MODEL_SIZE_GIB * 1024 * 1024 - ${existing_kb:-0}))
+    [ "$remaining_kb" -lt 0 ] && remaining_kb=0
+    required_kb=$((remaining_kb * 115 / 100))
+    free_kb=$(df -Pk "$MODELS_DIR" | awk 'NR == 2 {print $4}')
+    if [ -n "$free_kb" ] && [ "$free_kb" -lt "$required_kb" ]; then
+        print_error "Not enough disk space to download $MODEL_NAME."
+        print_error "Need about $((required_kb / 1024 / 1024))GiB free in $MODELS_DIR, only $((free_kb / 1024 / 1024))GiB available."
+        print_info "Increase your network volume size or free up space and re-run this script."
+        exit 1
+    fi
+
+    case $MODEL_TYPE in
+        "sdxl")
+            print_info "Starting Base SDXL model download in background..."
+            PYTHONUNBUFFERED=1 HF_XET_HIGH_PERFORMANCE=1 hf download "$MODEL_HF_REPO" sdXL_v10VAEFix.safetensors --local-dir "$MODEL_DIR" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
+            MODEL_DOWNLOAD_PID=$!
+            ;;
+
+        "z_image_turbo")
+            print_info "Starting Z Image Turbo model download in background..."
+            mkdir -p "$MODEL_DIR"
+            # Download only the needed files into an HF hub cache on the network volume and symlink them into place
+            (
+                set -e
+                export HF_HUB_CACHE="${HF_HUB_CACHE:-$NETWORK_VOLUME/hf_cache/hub}"
+                export HF_XET_HIGH_PERFORMANCE=1 PYTHONUNBUFFERED=1
+                # Stop both downloads if this job fails or is killed (e.g. by the timeout watchdog)
+                ADAPTER_PID=""
+                MAIN_PID=""
+                SNAPSHOT_FILE=$(mktemp)
+                trap 'kill $ADAPTER_PID $MAIN_PID 2>/dev/null || true; rm -f "$SNAPSHOT_FILE"' EXIT
+                trap 'exit 143' TERM
+
+                # The training adapter lives in a separate repo, fetch it concurrently with the main files
+                echo "Downloading Z Image Turbo training adapter..."
+                hf download ostris/zimage_turbo_training_adapter zimage_turbo_training_adapter_v2.safetensors \
+                    --local-dir "$MODEL_DIR" &
+                ADAPTER_PID=$!
+
+                echo "Downloading Z Image Turbo models from HuggingFace..."
+                # Download main model files (diffusion model, VAE, text encoder); --quiet prints only the snapshot path
+                hf download "$MODEL_HF_REPO" \
+                    split_files/diffusion_models/z_image_turbo_bf16.safetensors \
+                    split_files/vae/ae.safetensors \
+                    split_files/text_encoders/qwen_3_4b.safetensors \
+                    --max-workers "$HF_MAX_WORKERS" --quiet > "$SNAPSHOT_FILE" &
+                MAIN_PID=$!
+                wait "$MAIN_PID"
+                MAIN_PID=""
+                SNAPSHOT_DIR=$(cat "$SNAPSHOT_FILE")
+
+                echo "Linking model files from $SNAPSHOT_DIR..."
+                ln -sf "$SNAPSHOT_DIR/split_files/diffusion_models/z_image_turbo_bf16.safetensors" "$MODEL_DIR/"
+                ln -sf "$SNAPSHOT_DIR/split_files/vae/ae.safetensors" "$MODEL_DIR/"
+                ln -sf "$SNAPSHOT_DIR/split_files/text_encoders/qwen_3_4b.safetensors" "$MODEL_DIR/"
+
+                wait "$ADAPTER_PID"
+                ADAPTER_PID=""
+
+                echo "Z Image Turbo model download complete!"
+            ) > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
+            MODEL_DOWNLOAD_PID=$!
+            ;;
+
+        *)
+            # Full repo snapshot
+            print_info "Starting $MODEL_NAME model download in background..."
+            mkdir -p "$MODEL_DIR"
+            token_args=()
+            if [ "$MODEL_NEEDS_TOKEN" = "1" ]; then
+                token_args=(--token "$HUGGING_FACE_TOKEN")
+            fi
+            PYTHONUNBUFFERED=1 HF_XET_HIGH_PERFORMANCE=1 hf download "$MODEL_HF_REPO" --local-dir "$MODEL_DIR" "${token_args[@]}" --max-workers "$HF_MAX_WORKERS" > "$NETWORK_VOLUME/logs/model_download.log" 2>&1 &
+            MODEL_DOWNLOAD_PID=$!
+            ;;
+    esac
+fi
 
 echo ""
 
@@ -650,9 +642,9 @@ if [ "$CAPTION_MODE" != "skip" ]; then
 
         if [ -f "$JOY_CAPTION_SCRIPT" ]; then
             if [ -n "$TRIGGER_WORD" ]; then
-                bash "$JOY_CAPTION_SCRIPT" --trigger-word "$TRIGGER_WORD" > "$NETWORK_VOLUME/logs/image_captioning.log" 2>&1 &
+                PYTHONUNBUFFERED=1 bash "$JOY_CAPTION_SCRIPT" --trigger-word "$TRIGGER_WORD" > "$NETWORK_VOLUME/logs/image_captioning.log" 2>&1 &
             else
-                bash "$JOY_CAPTION_SCRIPT" > "$NETWORK_VOLUME/logs/image_captioning.log" 2>&1 &
+                PYTHONUNBUFFERED=1 bash "$JOY_CAPTION_SCRIPT" > "$NETWORK_VOLUME/logs/image_captioning.log" 2>&1 &
             fi
             IMAGE_CAPTION_PID=$!
             print_success "Image captioning started in background (PID: $IMAGE_CAPTION_PID)"
@@ -673,8 +665,9 @@ if [ "$CAPTION_MODE" != "skip" ]; then
                     exit 1
                 fi
                 echo -n "."
-                sleep 2
-                timeout_counter=$((timeout_counter + 2))
+                interval=$(poll_interval "$timeout_counter")
+                sleep "$interval"
+                timeout_counter=$((timeout_counter + interval))
                 if [ $timeout_counter -ge $max_timeout ]; then
                     print_error "Image captioning timed out after 1 hour. Check log: $NETWORK_VOLUME/logs/image_captioning.log"
                     exit 1
@@ -700,7 +693,7 @@ if [ "$CAPTION_MODE" != "skip" ]; then
         VIDEO_CAPTION_SCRIPT="$NETWORK_VOLUME/Captioning/video_captioner.sh"
 
         if [ -f "$VIDEO_CAPTION_SCRIPT" ]; then
-            bash "$VIDEO_CAPTION_SCRIPT" > "$NETWORK_VOLUME/logs/video_captioning.log" 2>&1 &
+            PYTHONUNBUFFERED=1 bash "$VIDEO_CAPTION_SCRIPT" > "$NETWORK_VOLUME/logs/video_captioning.log" 2>&1 &
             VIDEO_CAPTION_PID=$!
 
             # Wait for video captioning with progress indicator
@@ -719,8 +712,9 @@ if [ "$CAPTION_MODE" != "skip" ]; then
                     exit 1
                 fi
                 echo -n "."
-                sleep 2
-                timeout_counter=$((timeout_counter + 2))
+                interval=$(poll_interval "$timeout_counter")
+                sleep "$interval"
+                timeout_counter=$((timeout_counter + interval))
                 if [ $timeout_counter -ge $max_timeout ]; then
                     print_error "Video captioning timed out after 2 hours. Check log: $NETWORK_VOLUME/logs/video_captioning.log"
                     exit 1
@@ -752,93 +746,46 @@ if [ -n "$MODEL_DOWNLOAD_PID" ]; then
     print_info "To view model download progress, open a new terminal window and paste:"
     echo "  tail -f $NETWORK_VOLUME/logs/model_download.log"
     echo ""
-    timeout_counter=0
-    max_timeout=10800  # 3 hour timeout for large models
-    while kill -0 "$MODEL_DOWNLOAD_PID" 2>/dev/null; do
-        # Check for errors in log
-        if tail -n 20 "$NETWORK_VOLUME/logs/model_download.log" 2>/dev/null | grep -qi "error\|failed\|exception\|unauthorized\|403\|404"; then
-            print_error "Model download encountered errors. Check log: $NETWORK_VOLUME/logs/model_download.log"
-            kill "$MODEL_DOWNLOAD_PID" 2>/dev/null || true
-            exit 1
-        fi
-        echo -n "."
-        sleep 3
-        timeout_counter=$((timeout_counter + 3))
-        if [ $timeout_counter -ge $max_timeout ]; then
-            print_error "Model download timed out after 3 hours. Check log: $NETWORK_VOLUME/logs/model_download.log"
-            kill "$MODEL_DOWNLOAD_PID" 2>/dev/null || true
-            exit 1
-        fi
-    done
-    echo ""
-    wait "$MODEL_DOWNLOAD_PID"
-    download_exit_code=$?
-    
+    # Scale the timeout with the model size, assuming at least DOWNLOAD_MIN_MBPS (default 5 MB/s), minimum 30 minutes
+    min_mbps="${DOWNLOAD_MIN_MBPS:-5}"
+    if ! [[ "$min_mbps" =~ ^[1-9][0-9]*$ ]]; then
+        print_warning "Ignoring invalid DOWNLOAD_MIN_MBPS='$min_mbps' (expected a positive integer), using 5."
+        min_mbps=5
+    fi
+    max_timeout=$((MODEL_SIZE_GIB * 1024 / min_mbps))
+    [ "$max_timeout" -lt 1800 ] && max_timeout=1800
+    # Watchdog kills the download on timeout; wait returns as soon as the download exits
+    ( sleep "$max_timeout" && kill "$MODEL_DOWNLOAD_PID" 2>/dev/null ) &
+    WATCHDOG_PID=$!
+
+    download_exit_code=0
+    wait "$MODEL_DOWNLOAD_PID" || download_exit_code=$?
+
+    if kill -0 "$WATCHDOG_PID" 2>/dev/null; then
+        pkill -P "$WATCHDOG_PID" 2>/dev/null || true
+        kill "$WATCHDOG_PID" 2>/dev/null || true
+    else
+        print_error "Model download timed out after $((max_timeout / 60)) minutes. Check log: $NETWORK_VOLUME/logs/model_download.log"
+        exit 1
+    fi
+
     if [ $download_exit_code -ne 0 ]; then
         print_error "Model download failed with exit code $download_exit_code. Check log: $NETWORK_VOLUME/logs/model_download.log"
+        tail -n 20 "$NETWORK_VOLUME/logs/model_download.log" 2>/dev/null || true
         exit 1
     fi
-    
+
     # Verify model files actually exist based on MODEL_TYPE
     print_info "Verifying model download..."
-    case $MODEL_TYPE in
-        "flux")
-            if [ ! -f "$NETWORK_VOLUME/models/flux/flux1-dev.safetensors" ] && [ ! -d "$NETWORK_VOLUME/models/flux" ]; then
-                print_error "Flux model files not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "sdxl")
-            if [ ! -f "$NETWORK_VOLUME/models/sdXL_v10VAEFix.safetensors" ]; then
-                print_error "SDXL model file not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "wan13")
-            if [ ! -d "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-1.3B" ] || [ -z "$(ls -A "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-1.3B" 2>/dev/null)" ]; then
-                print_error "Wan 1.3B model files not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "wan14b_t2v")
-            if [ ! -d "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-14B" ] || [ -z "$(ls -A "$NETWORK_VOLUME/models/Wan/Wan2.1-T2V-14B" 2>/dev/null)" ]; then
-                print_error "Wan 14B T2V model files not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "wan14b_i2v")
-            if [ ! -d "$NETWORK_VOLUME/models/Wan/Wan2.1-I2V-14B-480P" ] || [ -z "$(ls -A "$NETWORK_VOLUME/models/Wan/Wan2.1-I2V-14B-480P" 2>/dev/null)" ]; then
-                print_error "Wan 14B I2V model files not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "qwen")
-            if [ ! -d "$NETWORK_VOLUME/models/Qwen-Image" ] || [ -z "$(ls -A "$NETWORK_VOLUME/models/Qwen-Image" 2>/dev/null)" ]; then
-                print_error "Qwen Image model files not found after download. Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-        "z_image_turbo")
-            missing_files=""
-            if [ ! -f "$NETWORK_VOLUME/models/z_image/z_image_turbo_bf16.safetensors" ]; then
-                missing_files="$missing_files z_image_turbo_bf16.safetensors"
-            fi
-            if [ ! -f "$NETWORK_VOLUME/models/z_image/ae.safetensors" ]; then
-                missing_files="$missing_files ae.safetensors"
-            fi
-            if [ ! -f "$NETWORK_VOLUME/models/z_image/qwen_3_4b.safetensors" ]; then
-                missing_files="$missing_files qwen_3_4b.safetensors"
-            fi
-            if [ ! -f "$NETWORK_VOLUME/models/z_image/zimage_turbo_training_adapter_v2.safetensors" ]; then
-                missing_files="$missing_files zimage_turbo_training_adapter_v2.safetensors"
-            fi
-            if [ -n "$missing_files" ]; then
-                print_error "Z Image Turbo model files missing after download:$missing_files"
-                print_error "Check log: $NETWORK_VOLUME/logs/model_download.log"
-                exit 1
-            fi
-            ;;
-    esac
+    if ! model_files_present; then
+        if [ -n "$MISSING_MODEL_FILES" ]; then
+            print_error "$MODEL_NAME model files missing after download:$MISSING_MODEL_FILES"
+        else
+            print_error "$MODEL_NAME model files not found after download."
+        fi
+        print_error "Check log: $NETWORK_VOLUME/logs/model_download.log"
+        exit 1
+    fi
     print_success "Model download completed and verified!"
     echo ""
 fi
@@ -847,8 +794,6 @@ fi
 print_header "Configuring Dataset"
 echo ""
 
-DATASET_TOML="$NETWORK_VOLUME/diffusion-pipe/examples/dataset.toml"
-
 if [ -f "$DATASET_TOML" ]; then
     print_info "Updating dataset.toml with actual paths..."
 
@@ -903,7 +848,6 @@ else
 fi
 
 # Read training parameters from model TOML file
-MODEL_TOML="$NETWORK_VOLUME/diffusion-pipe/examples/$TOML_FILE"
 if [ -f "$MODEL_TOML" ]; then
     EPOCHS=$(grep "^epochs = " "$MODEL_TOML" | sed 's/epochs = //')
     SAVE_EVERY=$(grep "^save_every_n_epochs = " "$MODEL_TOML" | sed 's/save_every_n_epochs = //')
@@ -950,14 +894,14 @@ if [ "$CAPTION_MODE" != "skip" ]; then
 
     # Always show image dataset info
     if [ "$CAPTION_MODE" = "images" ] || [ "$CAPTION_MODE" = "both" ]; then
-        IMAGE_COUNT=$(find "$NETWORK_VOLUME/image-dataset" -maxdepth 1 -type f \( -iname "*.jpg" -o -iname "*.jpeg" -o -iname "*.png" -o -iname "*.bmp" -o -iname "*.gif" -o -iname "*.tiff" -o -iname "*.webp" \) | wc -l)
+        IMAGE_COUNT=$(count_dataset_files "$NETWORK_VOLUME/image-dataset" "$IMAGE_EXT_REGEX")
         echo "  📷 Images: $NETWORK_VOLUME/image-dataset ($IMAGE_COUNT files)"
         echo "     Repeats: 1 per epoch"
     fi
 
     # Show video dataset info if applicable
     if [ "$CAPTION_MODE" = "videos" ] || [ "$CAPTION_MODE" = "both" ]; then
-        VIDEO_COUNT=$(find "$NETWORK_VOLUME/video-dataset" -maxdepth 1 -type f \( -iname "*.mp4" -o -iname "*.avi" -o -iname "*.mov" -o -iname "*.mkv" -o -iname "*.webm" \) | wc -l)
+        VIDEO_COUNT=$(count_dataset_files "$NETWORK_VOLUME/video-dataset" "$VIDEO_EXT_REGEX")
         echo "  🎬 Videos: $NETWORK_VOLUME/video-dataset ($VIDEO_COUNT files)"
         echo "     Repeats: 5 per epoch"
     fi
@@ -965,7 +909,7 @@ else
     echo -e "${BOLD}Dataset:${NC} Using existing captions"
 fi
 
-if [ "$MODEL_TYPE" = "flux" ]; then
+if [ "$MODEL_NEEDS_TOKEN" = "1" ]; then
     echo -e "${BOLD}Hugging Face Token:${NC} Set ✓"
 fi
 
@@ -982,10 +926,10 @@ echo ""
 print_info "Before starting training, you can modify the default training parameters in these files:"
 echo ""
 echo -e "${BOLD}1. Model Configuration:${NC}"
-echo "   $NETWORK_VOLUME/diffusion-pipe/examples/$TOML_FILE"
+echo "   $MODEL_TOML"
 echo ""
 echo -e "${BOLD}2. Dataset Configuration:${NC}"
-echo "   $NETWORK_VOLUME/diffusion-pipe/examples/dataset.toml"
+echo "   $DATASET_TOML"
 echo ""
 
 print_warning "These files contain important settings like:"
@@ -1010,8 +954,8 @@ while true; do
             print_info "Training paused for manual configuration."
             echo ""
             echo -e "${BOLD}Configuration Files:${NC}"
-            echo "1. Model settings: $NETWORK_VOLUME/diffusion-pipe/examples/$TOML_FILE"
-            echo "2. Dataset settings: $NETWORK_VOLUME/diffusion-pipe/examples/dataset.toml"
+            echo "1. Model settings: $MODEL_TOML"
+            echo "2. Dataset settings: $DATASET_TOML"
             echo ""
             print_warning "Please modify these files as needed, then return here to continue."
             echo ""
@@ -1024,8 +968,6 @@ while true; do
                         echo ""
 
                         # Re-read training parameters from updated TOML files
-                        MODEL_TOML="$NETWORK_VOLUME/diffusion-pipe/examples/$TOML_FILE"
-                        DATASET_TOML="$NETWORK_VOLUME/diffusion-pipe/examples/dataset.toml"
 
                         # Read resolution from dataset.toml
                         if [ -f "$DATASET_TOML" ]; then
@@ -1180,19 +1122,53 @@ if [ "$CAPTION_MODE" = "videos" ] || [ "$CAPTION_MODE" = "both" ]; then
     echo ""
 fi
 
+# Install a Python package only if it is missing or older than the optional minimum version
+# (setup.sh already installs these, so repeat launches skip pip entirely)
+ensure_package() {
+    local pkg=$1
+    local min_version=$2
+
+    # Exits non-zero when the package is missing, too old, or the check itself fails
+    if python3 - "$pkg" "$min_version" 2>/dev/null << 'PYTHON_EOF'
+import sys
+from importlib.metadata import version
+
+pkg, min_version = sys.argv[1], sys.argv[2]
+installed = version(pkg)
+if min_version:
+    from packaging.version import Version
+    sys.exit(1 if Version(installed) < Version(min_version) else 0)
+PYTHON_EOF
+    then
+        print_success "$pkg is already installed."
+        return 0
+    fi
+
+    print_info "Installing $pkg${min_version:+>=$min_version}..."
+    # stdin from /dev/null so pip can never block waiting for input
+    if ! pip install --upgrade -q "$pkg${min_version:+>=$min_version}" < /dev/null; then
+        print_error "Failed to install $pkg${min_version:+>=$min_version}."
+        exit 1
+    fi
+}
+
 # Start training
 print_header "Starting Training"
 echo ""
 
-print_info "Changing to diffusion-pipe directory..."
-cd "$NETWORK_VOLUME/diffusion-pipe"
+DIFF_PIPE_DIR="$NETWORK_VOLUME/diffusion-pipe"
+if [ ! -d "$DIFF_PIPE_DIR" ]; then
+    print_error "diffusion-pipe directory not found: $DIFF_PIPE_DIR"
+    exit 1
+fi
 
-print_info "Ensuring dependencies are up to date before training..."
-print_info "Upgrading transformers package..."
-pip install transformers -U
+# Training environment, exported once so every process launched from here on sees the same settings
+export NCCL_P2P_DISABLE="1"
+export NCCL_IB_DISABLE="1"
 
-print_info "Upgrading peft package..."
-pip install --upgrade "peft>=0.17.0"
+print_info "Ensuring dependencies are up to date before training..."
+ensure_package transformers
+ensure_package peft 0.17.0
 
 echo ""
 
@@ -1227,6 +1203,7 @@ print_info "You can monitor progress in the console output below."
 echo ""
 
 # Start training with the appropriate TOML file
-NCCL_P2P_DISABLE="1" NCCL_IB_DISABLE="1" deepspeed --num_gpus=1 train.py --deepspeed --config "examples/$TOML_FILE"
-
-print_success "Training completed!"
+# train.py must run from the diffusion-pipe checkout; change directory only for the exec'd process
+# exec replaces this shell with deepspeed, so nothing after this line runs
+cd "$DIFF_PIPE_DIR"
+exec deepspeed --num_gpus=1 train.py --deepspeed --config "examples/$TOML_FILE"